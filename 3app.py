@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib import colors
@@ -7,7 +8,123 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import io
 from datetime import datetime
-import num2words
+from itertools import islice
+from zipfile import BadZipFile
+
+# Header table rows; the rows in HEADER_DYNAMIC_ROWS are filled in per invoice
+HEADER_TEMPLATE = [
+    ("Supplier Name", "No. & date of PI"),
+    ("SAR APPARELS INDIA PVT.LTD.", "{pi_number} Dt. {invoice_date}"),
+    ("ADDRESS : 6, Picaso Bithi, KOLKATA - 700017.", "Landmark order Reference: {po_reference}"),
+    ("PHONE : 9874173373", "Buyer Name: LANDMARK GROUP"),
+    ("FAX : N.A.", "Brand Name: Juniors"),
+    ("", "Payment Term: T/T"),
+    ("Consignee:-", ""),
+    ("RNA Resources Group Ltd- Landmark (Babyshop),", "Bank Details (Including Swift/IBAN)"),
+    ("P O Box 25030, Dubai, UAE,", ":- SAR APPARELS INDIA PVT.LTD"),
+    ("Tel: 00971 4 8095500, Fax: 00971 4 8095555/66", "BENEFICIARY"),
+    ("", "ACCOUNT NO :- 2112819952"),
+    ("", "BANK'S NAME :- KOTAK MAHINDRA BANK LTD"),
+    ("", "BANK ADDRESS :- 2 BRABOURNE ROAD, GOVIND BHAVAN, GROUND FLOOR,"),
+    ("", "KOLKATA-700001"),
+    ("", "SWIFT CODE :- KKBKINBBCPC"),
+    ("", "BANK CODE :- 0323"),
+    ("Loading Country: India", "L/C Advicing Bank (If Payment term LC Applicable )"),
+    ("Port of loading: Mumbai", ""),
+    ("Agreed Shipment Date: {shipment_date}", ""),
+    ("REMARKS if ANY:-", ""),
+    ("Description of goods: Value Packs", "CURRENCY: USD"),
+]
+HEADER_DYNAMIC_ROWS = (1, 2, 18)
+
+# Column mapping from Excel to expected format
+COLUMN_MAPPING = {
+    'Style': 'StyleID',
+    'Description': 'Item Description', 
+    'Material Composition': 'Composition',
+    'USD FOB$': 'Unit Price',
+    'Total Qty': 'Qty',
+    'Total Value': 'Amount'
+}
+
+# Every column the invoice can use, under either name; the rest of the sheet is skipped
+EXCEL_COLUMNS = (
+    set(COLUMN_MAPPING) | set(COLUMN_MAPPING.values())
+    | {'Fabric Type', 'HS Code', 'Country of Origin'}
+)
+
+# Table styles are static (negative indices resolve per table), so build them once
+HEADER_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0,0), (-1,-1), 8),
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('LEFTPADDING', (0,0), (-1,-1), 3),
+    ('RIGHTPADDING', (0,0), (-1,-1), 3),
+    ('TOPPADDING', (0,0), (-1,-1), 2),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+])
+
+MAIN_TABLE_STYLE = TableStyle([
+    # Header row styling
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,-1), 7),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    
+    # Grid
+    ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+    
+    # Total row styling
+    ('BACKGROUND', (0,-1), (-1,-1), colors.lightgrey),
+    ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
+    
+    # Column alignments
+    ('ALIGN', (6,1), (6,-2), 'RIGHT'),  # Qty column
+    ('ALIGN', (7,1), (7,-2), 'RIGHT'),  # Price column
+    ('ALIGN', (8,1), (8,-1), 'RIGHT'),  # Amount column
+    
+    # Padding
+    ('LEFTPADDING', (0,0), (-1,-1), 3),
+    ('RIGHTPADDING', (0,0), (-1,-1), 3),
+    ('TOPPADDING', (0,0), (-1,-1), 3),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 3),
+])
+
+FOOTER_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0,0), (-1,-1), 9),
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('ALIGN', (0,0), (0,0), 'CENTER'),  # Total alignment
+    ('LEFTPADDING', (0,0), (-1,-1), 3),
+    ('RIGHTPADDING', (0,0), (-1,-1), 3),
+])
+
+def first_valid(values, starts, ends):
+    """
+    First non-null value of each group of consecutive rows [start, end),
+    matching groupby 'first' semantics
+    """
+    valid_idx = np.flatnonzero(pd.notna(values))
+    if len(valid_idx) == 0:
+        return np.full(len(starts), np.nan, dtype=object)
+    
+    pos = np.minimum(np.searchsorted(valid_idx, starts), len(valid_idx) - 1)
+    candidates = valid_idx[pos]
+    found = (candidates >= starts) & (candidates < ends)
+    if found.all():
+        return values[candidates]
+    
+    result = np.full(len(starts), np.nan, dtype=object)
+    result[found] = values[candidates[found]]
+    return result
+
+def canonical_columns(df):
+    """
+    Rename Excel column names to the canonical names in COLUMN_MAPPING
+    Columns whose canonical name is already present are left alone
+    Returns: a new DataFrame (rename never modifies df)
+    """
+    renames = {k: v for k, v in COLUMN_MAPPING.items() if k in df.columns and v not in df.columns}
+    return df.rename(columns=renames)
 
 def process_excel_data(df):
     """
@@ -16,21 +133,8 @@ def process_excel_data(df):
     - Sum quantities and amounts
     - Get unique values for other fields
     """
-    # Column mapping from Excel to expected format
-    column_mapping = {
-        'Style': 'StyleID',
-        'Description': 'Item Description', 
-        'Material Composition': 'Composition',
-        'USD FOB$': 'Unit Price',
-        'Total Qty': 'Qty',
-        'Total Value': 'Amount'
-    }
-    
     # Rename columns to match expected format
-    df_processed = df.copy()
-    for old_col, new_col in column_mapping.items():
-        if old_col in df.columns:
-            df_processed = df_processed.rename(columns={old_col: new_col})
+    df_processed = canonical_columns(df)
     
     # Group by StyleID to aggregate data
     if 'StyleID' in df_processed.columns:
@@ -46,8 +150,34 @@ def process_excel_data(df):
         # Only include columns that exist in the DataFrame
         existing_agg = {k: v for k, v in agg_functions.items() if k in df_processed.columns}
         
-        # Group and aggregate
-        grouped_df = df_processed.groupby('StyleID').agg(existing_agg).reset_index()
+        # Shrink the frame before grouping: quantities go to the smallest integer
+        # type that holds them, and StyleID becomes a categorical so the sort and
+        # boundary scan below compare integer codes instead of Python strings
+        df_clean = df_processed.dropna(subset=['StyleID'])
+        downcast = {'StyleID': df_clean['StyleID'].astype('category')}
+        if 'Qty' in df_clean.columns:
+            downcast['Qty'] = pd.to_numeric(df_clean['Qty'], errors='coerce', downcast='integer')
+        df_clean = df_clean.assign(**downcast)
+        
+        # Group and aggregate: after a stable sort each style is a contiguous run
+        # of rows, so groups are reduced by slicing instead of hashing keys
+        df_sorted = df_clean.sort_values('StyleID', kind='stable')
+        codes = df_sorted['StyleID'].cat.codes.to_numpy()
+        style_ids = df_sorted['StyleID'].to_numpy()
+        n = len(codes)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n else np.array([], dtype=np.intp)
+        ends = np.r_[starts[1:], n].astype(np.intp)
+        
+        grouped = {'StyleID': style_ids[starts]}
+        for col, how in existing_agg.items():
+            if how == 'sum':
+                values = df_sorted[col].fillna(0).to_numpy()
+                # Accumulate in at least 64 bits so downcast columns cannot overflow
+                total_dtype = np.promote_types(values.dtype, np.int64)
+                grouped[col] = np.add.reduceat(values, starts, dtype=total_dtype) if n else values
+            else:
+                grouped[col] = first_valid(df_sorted[col].to_numpy(), starts, ends)
+        grouped_df = pd.DataFrame(grouped).infer_objects()
         
         # Add default values for missing required columns
         required_columns = {
@@ -66,77 +196,177 @@ def process_excel_data(df):
         st.error("StyleID column not found in the Excel file")
         return df_processed
 
-def generate_proforma_invoice(df, pi_number=None, po_reference=None, shipment_date=None):
+def col_or_default(df, name, default, n):
+    """
+    Return column `name` as a string array, or an array of `default` if absent
+    """
+    if name in df.columns:
+        return df[name].fillna(default).astype(str).to_numpy()
+    return np.full(n, default, dtype=object)
+
+def get_numeric_columns(df):
+    """
+    Extract quantity, unit price and amount as NumPy arrays
+    Expects canonical column names (see canonical_columns)
+    - Missing columns and NaN values become 0
+    - Zero amounts are filled in from qty * price
+    """
+    zeros = pd.Series(0, index=df.index)
+    qtys = pd.to_numeric(df.get('Qty', zeros), errors='coerce').fillna(0).to_numpy()
+    prices = pd.to_numeric(df.get('Unit Price', zeros), errors='coerce').fillna(0).to_numpy()
+    amounts = pd.to_numeric(df.get('Amount', zeros), errors='coerce').fillna(0).to_numpy()
+    
+    # If amount is 0 but we have qty and price, calculate it
+    amounts = np.where((amounts == 0) & (qtys > 0) & (prices > 0), qtys * prices, amounts)
+    
+    return qtys, prices, amounts
+
+def hash_dataframe(df):
+    """
+    Cache key for a DataFrame built from pandas' vectorized row hashes
+    Much faster than Streamlit's default DataFrame hashing on large frames
+    """
+    return tuple(df.columns), pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+
+@st.cache_resource
+def get_paragraph_styles():
+    """
+    ReportLab paragraph styles used by the invoice, built once per process
+    Returns: dict of style name -> ParagraphStyle
+    """
+    styles = getSampleStyleSheet()
+    return {
+        'CustomTitle': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=14,
+            spaceAfter=12,
+            alignment=1,  # Center
+            textColor=colors.black
+        ),
+        'TotalWords': ParagraphStyle(
+            'TotalWords',
+            parent=styles['Normal'],
+            fontSize=9,
+            alignment=1,  # Center
+            spaceAfter=12
+        ),
+    }
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def read_excel_preview(file_bytes, n=10):
+    """
+    Read only the header and first n rows of the first sheet for the preview
+    openpyxl's read-only mode streams rows, so the rest of the file is never parsed
+    """
+    # Imported here so app start-up does not pay for it until a file is uploaded
+    import openpyxl
+    
+    try:
+        workbook = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    except BadZipFile:
+        # Legacy .xls files are not zip based and openpyxl cannot read them
+        return pd.read_excel(io.BytesIO(file_bytes), engine='calamine', nrows=n)
+    
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        data = list(islice(rows, n))
+    finally:
+        workbook.close()
+    
+    # Read-only mode pads rows out to the sheet's dimension, so a formatted but empty
+    # cell past the data adds blank rows and columns; drop those like read_excel does
+    data = [row for row in data if any(value is not None for value in row)]
+    width = len(header)
+    while width and header[width - 1] is None and all(len(row) < width or row[width - 1] is None for row in data):
+        width -= 1
+    
+    # Name the remaining blank or repeated headers the way read_excel does
+    columns, seen = [], {}
+    for i, name in enumerate(header[:width]):
+        if name is None:
+            name = f"Unnamed: {i}"
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        columns.append(f"{name}.{count}" if count else name)
+    
+    return pd.DataFrame([row[:width] for row in data], columns=columns)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_excel_file(file_bytes):
+    """
+    Read and process the uploaded Excel file, cached on the raw file bytes
+    Returns: original DataFrame, processed DataFrame
+    """
+    # calamine (Rust) parses much faster than openpyxl; usecols skips unused columns
+    df_original = pd.read_excel(
+        io.BytesIO(file_bytes),
+        engine='calamine',
+        usecols=lambda col: col in EXCEL_COLUMNS
+    )
+    return df_original, process_excel_data(df_original)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def amount_in_words(amount_cents):
+    """
+    Spell out a USD amount given in cents, e.g. 'ONE HUNDRED DOLLARS'
+    Cached so re-renders with an unchanged total skip num2words
+    """
+    # Imported here so app start-up does not pay for it until a PDF is generated
+    from num2words import num2words
+    
+    # num2words reads an int as cents, so pass dollars as a float
+    amount_words = num2words(amount_cents / 100, to='currency', currency='USD').upper()
+    # Clean up the words format
+    return amount_words.replace(', ZERO CENTS', '')
+
+@st.cache_data(show_spinner=False, max_entries=16, hash_funcs={pd.DataFrame: hash_dataframe})
+def generate_proforma_invoice(df, pi_number=None, po_reference=None, shipment_date=None, invoice_date=None):
     """
     Generate proforma invoice PDF from DataFrame matching the exact format
-    Returns: PDF bytes, total_qty, total_amount
+    Cached on the DataFrame and invoice settings, so repeated clicks skip doc.build
+    Returns: PDF buffer (rewound), total_qty, total_amount
     """
+    # One canonical name per field, so nothing below needs alias fallbacks
+    df = canonical_columns(df)
+    
     pdf_buffer = io.BytesIO()
     
     # ===== PDF Setup =====
-    styles = getSampleStyleSheet()
+    styles = get_paragraph_styles()
     doc = SimpleDocTemplate(pdf_buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
     elements = []
     
     # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=14,
-        spaceAfter=12,
-        alignment=1,  # Center
-        textColor=colors.black
-    )
-    
-    header_style = ParagraphStyle(
-        'HeaderStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        spaceAfter=3
-    )
+    title_style = styles['CustomTitle']
+    total_words_style = styles['TotalWords']
     
     # Generate PI number if not provided
     if not pi_number:
         pi_number = f"SAR/LG/{datetime.now().strftime('%m%d')}"
     
+    # Invoice date is part of the cache key so a cached PDF never goes stale
+    if not invoice_date:
+        invoice_date = datetime.now().strftime('%d-%m-%Y')
+    
     # ===== HEADER SECTION =====
     elements.append(Paragraph("Proforma Invoice", title_style))
     elements.append(Spacer(1, 6))
     
-    # Create header table with supplier and PI details
-    header_data = [
-        ["Supplier Name", "No. & date of PI"],
-        ["SAR APPARELS INDIA PVT.LTD.", f"{pi_number} Dt. {datetime.now().strftime('%d-%m-%Y')}"],
-        ["ADDRESS : 6, Picaso Bithi, KOLKATA - 700017.", f"Landmark order Reference: {po_reference or 'CPO/47062/25'}"],
-        ["PHONE : 9874173373", f"Buyer Name: LANDMARK GROUP"],
-        ["FAX : N.A.", "Brand Name: Juniors"],
-        ["", "Payment Term: T/T"],
-        ["Consignee:-", ""],
-        ["RNA Resources Group Ltd- Landmark (Babyshop),", "Bank Details (Including Swift/IBAN)"],
-        ["P O Box 25030, Dubai, UAE,", ":- SAR APPARELS INDIA PVT.LTD"],
-        ["Tel: 00971 4 8095500, Fax: 00971 4 8095555/66", "BENEFICIARY"],
-        ["", "ACCOUNT NO :- 2112819952"],
-        ["", "BANK'S NAME :- KOTAK MAHINDRA BANK LTD"],
-        ["", "BANK ADDRESS :- 2 BRABOURNE ROAD, GOVIND BHAVAN, GROUND FLOOR,"],
-        ["", "KOLKATA-700001"],
-        ["", "SWIFT CODE :- KKBKINBBCPC"],
-        ["", "BANK CODE :- 0323"],
-        ["Loading Country: India", "L/C Advicing Bank (If Payment term LC Applicable )"],
-        ["Port of loading: Mumbai", ""],
-        [f"Agreed Shipment Date: {shipment_date or '07-02-2025'}", ""],
-        ["REMARKS if ANY:-", ""],
-        ["Description of goods: Value Packs", "CURRENCY: USD"]
-    ]
+    # Create header table with supplier and PI details; only a few rows vary per invoice
+    header_fields = {
+        'pi_number': pi_number,
+        'invoice_date': invoice_date,
+        'po_reference': po_reference or 'CPO/47062/25',
+        'shipment_date': shipment_date or '07-02-2025',
+    }
+    header_data = list(HEADER_TEMPLATE)
+    for i in HEADER_DYNAMIC_ROWS:
+        header_data[i] = tuple(cell.format(**header_fields) for cell in HEADER_TEMPLATE[i])
     
     header_table = Table(header_data, colWidths=[4*inch, 4*inch])
-    header_table.setStyle(TableStyle([
-        ('FONTSIZE', (0,0), (-1,-1), 8),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 3),
-        ('RIGHTPADDING', (0,0), (-1,-1), 3),
-        ('TOPPADDING', (0,0), (-1,-1), 2),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-    ]))
+    header_table.setStyle(HEADER_TABLE_STYLE)
     
     elements.append(header_table)
     elements.append(Spacer(1, 12))
@@ -147,73 +377,33 @@ def generate_proforma_invoice(df, pi_number=None, po_reference=None, shipment_da
          "COMPOSITION OF\nMATERIAL", "COUNTRY OF\nORIGIN", "QTY", "UNIT PRICE\nFOB", "AMOUNT"]
     ]
     
-    total_qty = 0
-    total_amount = 0
+    # Pull each column out as a NumPy array, filling NaN with the defaults
+    n = len(df)
+    style_ids = col_or_default(df, 'StyleID', '', n)
+    descriptions = col_or_default(df, 'Item Description', '', n)
+    compositions = col_or_default(df, 'Composition', '', n)
+    fabric_types = col_or_default(df, 'Fabric Type', 'KNITTED', n)
+    countries = col_or_default(df, 'Country of Origin', 'India', n)
     
-    for _, row in df.iterrows():
-        # Handle different possible column names and NaN values
-        qty = 0
-        if 'Qty' in row:
-            qty = row['Qty'] if pd.notna(row['Qty']) else 0
-        elif 'Total Qty' in row:
-            qty = row['Total Qty'] if pd.notna(row['Total Qty']) else 0
-            
-        price = 0
-        if 'Unit Price' in row:
-            price = row['Unit Price'] if pd.notna(row['Unit Price']) else 0
-        elif 'USD FOB$' in row:
-            price = row['USD FOB$'] if pd.notna(row['USD FOB$']) else 0
-            
-        amount = 0
-        if 'Amount' in row:
-            amount = row['Amount'] if pd.notna(row['Amount']) else 0
-        elif 'Total Value' in row:
-            amount = row['Total Value'] if pd.notna(row['Total Value']) else 0
-        
-        # If amount is 0 but we have qty and price, calculate it
-        if amount == 0 and qty > 0 and price > 0:
-            amount = qty * price
-        
-        total_qty += qty
-        total_amount += amount
-        
-        # Get other fields with fallbacks
-        style_id = ""
-        if 'StyleID' in row:
-            style_id = str(row['StyleID']) if pd.notna(row['StyleID']) else ""
-        elif 'Style' in row:
-            style_id = str(row['Style']) if pd.notna(row['Style']) else ""
-            
-        description = ""
-        if 'Item Description' in row:
-            description = str(row['Item Description']) if pd.notna(row['Item Description']) else ""
-        elif 'Description' in row:
-            description = str(row['Description']) if pd.notna(row['Description']) else ""
-            
-        composition = ""
-        if 'Composition' in row:
-            composition = str(row['Composition']) if pd.notna(row['Composition']) else ""
-        elif 'Material Composition' in row:
-            composition = str(row['Material Composition']) if pd.notna(row['Material Composition']) else ""
-        
-        fabric_type = str(row.get('Fabric Type', 'KNITTED')) if pd.notna(row.get('Fabric Type', 'KNITTED')) else 'KNITTED'
-        hs_code = str(row.get('HS Code', '61112000')) if pd.notna(row.get('HS Code', '61112000')) else '61112000'
-        country = str(row.get('Country of Origin', 'India')) if pd.notna(row.get('Country of Origin', 'India')) else 'India'
-        
-        # Clean up HS code (remove dots)
-        hs_code = hs_code.replace(".", "")
-        
-        table_data.append([
-            style_id,
-            description,
-            fabric_type,
-            hs_code,
-            composition,
-            country,
-            f"{int(qty):,}" if qty > 0 else "",
-            f"{price:.2f}" if price > 0 else "",
-            f"{amount:.2f}" if amount > 0 else ""
-        ])
+    # Clean up HS codes (remove dots) in one pass
+    hs_codes = pd.Series(col_or_default(df, 'HS Code', '61112000', n)).str.replace('.', '', regex=False).to_numpy()
+    qtys, prices, amounts = get_numeric_columns(df)
+    
+    # Totals come straight from the arrays, no per-row accumulation
+    total_qty = int(qtys.sum())
+    total_amount = float(amounts.sum())
+    
+    # Format the numeric cells a column at a time, blank where the value is 0
+    qty_strs = np.where(qtys > 0, pd.Series(qtys).astype(np.int64).map('{:,}'.format).to_numpy(), '')
+    price_strs = np.where(prices > 0, np.char.mod('%.2f', prices.astype(np.float64)), '')
+    amount_strs = np.where(amounts > 0, np.char.mod('%.2f', amounts.astype(np.float64)), '')
+    
+    table_data.extend(
+        list(row) for row in zip(
+            style_ids, descriptions, fabric_types, hs_codes, compositions, countries,
+            qty_strs, price_strs, amount_strs
+        )
+    )
     
     # Add total row
     table_data.append([
@@ -222,54 +412,17 @@ def generate_proforma_invoice(df, pi_number=None, po_reference=None, shipment_da
     
     # Create main table
     main_table = Table(table_data, repeatRows=1)
-    main_table.setStyle(TableStyle([
-        # Header row styling
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 7),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        
-        # Grid
-        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-        
-        # Total row styling
-        ('BACKGROUND', (0,-1), (-1,-1), colors.lightgrey),
-        ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
-        
-        # Column alignments
-        ('ALIGN', (6,1), (6,-2), 'RIGHT'),  # Qty column
-        ('ALIGN', (7,1), (7,-2), 'RIGHT'),  # Price column
-        ('ALIGN', (8,1), (8,-1), 'RIGHT'),  # Amount column
-        
-        # Padding
-        ('LEFTPADDING', (0,0), (-1,-1), 3),
-        ('RIGHTPADDING', (0,0), (-1,-1), 3),
-        ('TOPPADDING', (0,0), (-1,-1), 3),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 3),
-    ]))
+    main_table.setStyle(MAIN_TABLE_STYLE)
     
     elements.append(main_table)
     elements.append(Spacer(1, 12))
     
     # ===== TOTAL IN WORDS =====
     try:
-        amount_words = num2words.num2words(int(total_amount), to='currency', currency='USD').upper()
-        # Clean up the words format
-        amount_words = amount_words.replace(' AND ZERO CENTS', ' DOLLARS')
-        if 'CENTS' not in amount_words and 'DOLLARS' not in amount_words:
-            amount_words += ' DOLLARS'
-    except:
+        amount_words = amount_in_words(int(round(total_amount * 100)))
+    except (ValueError, OverflowError):
         amount_words = f"TOTAL AMOUNT: ${total_amount:,.2f}"
     
-    total_words_style = ParagraphStyle(
-        'TotalWords',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=1,  # Center
-        spaceAfter=12
-    )
-    
     elements.append(Paragraph(f"TOTAL US DOLLAR {amount_words}", total_words_style))
     elements.append(Spacer(1, 20))
     
@@ -282,20 +435,14 @@ def generate_proforma_invoice(df, pi_number=None, po_reference=None, shipment_da
     ]
     
     footer_table = Table(footer_data, colWidths=[2*inch, 6*inch])
-    footer_table.setStyle(TableStyle([
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (0,0), (0,0), 'CENTER'),  # Total alignment
-        ('LEFTPADDING', (0,0), (-1,-1), 3),
-        ('RIGHTPADDING', (0,0), (-1,-1), 3),
-    ]))
+    footer_table.setStyle(FOOTER_TABLE_STYLE)
     
     elements.append(footer_table)
     
     # ===== Build PDF =====
     doc.build(elements)
     pdf_buffer.seek(0)
-    return pdf_buffer.getvalue(), total_qty, total_amount
+    return pdf_buffer, total_qty, total_amount
 
 def main():
     st.set_page_config(
@@ -343,18 +490,18 @@ def main():
     
     if uploaded_file is not None:
         try:
-            # Read the Excel file
-            df_original = pd.read_excel(uploaded_file)
+            file_bytes = uploaded_file.getvalue()
             
-            # Display original file info
-            st.success(f"✅ File uploaded successfully! ({len(df_original)} rows)")
-            
-            # Show original data preview
+            # Show original data preview straight away, reading only the first rows
             st.subheader("📊 Original Data Preview")
-            st.dataframe(df_original.head(10), use_container_width=True)
+            st.dataframe(read_excel_preview(file_bytes), use_container_width=True)
+            
+            # Read and process the full Excel file (cached on the file contents)
+            with st.spinner("Reading Excel file..."):
+                df_original, df_processed = load_excel_file(file_bytes)
             
-            # Process the data for PDF generation
-            df_processed = process_excel_data(df_original)
+            # Display original file info
+            st.success(f"✅ File uploaded successfully! ({len(df_original)} rows)")
             
             # Show processed data preview
             st.subheader("🔄 Processed Data (Grouped by Style)")
@@ -365,24 +512,12 @@ def main():
             with col1:
                 st.metric("Original Items", len(df_original))
                 st.metric("Grouped Items", len(df_processed))
+            # Calculate totals from processed data the same way the PDF does
+            qtys, _, amounts = get_numeric_columns(df_processed)
             with col2:
-                # Calculate totals from processed data
-                qty_cols = ['Qty', 'Total Qty']
-                total_qty = 0
-                for col in qty_cols:
-                    if col in df_processed.columns:
-                        total_qty = df_processed[col].fillna(0).sum()
-                        break
-                st.metric("Total Quantity", f"{int(total_qty):,}")
+                st.metric("Total Quantity", f"{int(qtys.sum()):,}")
             with col3:
-                # Calculate total amount
-                amount_cols = ['Amount', 'Total Value']
-                total_amount = 0
-                for col in amount_cols:
-                    if col in df_processed.columns:
-                        total_amount = df_processed[col].fillna(0).sum()
-                        break
-                st.metric("Total Amount", f"${total_amount:,.2f}")
+                st.metric("Total Amount", f"${amounts.sum():,.2f}")
             
             # Invoice customization
             st.subheader("🎯 Invoice Settings")
@@ -411,9 +546,10 @@ def main():
             # Generate PDF button
             if st.button("🚀 Generate Proforma Invoice PDF", type="primary", use_container_width=True):
                 try:
+                    invoice_date = datetime.now().strftime('%d-%m-%Y')
                     with st.spinner("Generating PDF in Landmark format... Please wait"):
-                        pdf_bytes, total_qty, total_amount = generate_proforma_invoice(
-                            df_processed, pi_number, po_reference, shipment_date
+                        pdf_buffer, total_qty, total_amount = generate_proforma_invoice(
+                            df_processed, pi_number, po_reference, shipment_date, invoice_date
                         )
                     
                     st.success("✅ PDF generated successfully!")
@@ -428,10 +564,10 @@ def main():
                         st.metric("Total Amount", f"${total_amount:,.2f}")
                     
                     # Download button
-                    filename = f"PI_{pi_number.replace('/', '_')}_{datetime.now().strftime('%d-%m-%Y')}"
+                    filename = f"PI_{pi_number.replace('/', '_')}_{invoice_date}"
                     st.download_button(
                         label="📥 Download Proforma Invoice PDF",
-                        data=pdf_bytes,
+                        data=pdf_buffer,
                         file_name=f"{filename}.pdf",
                         mime="application/pdf",
                         type="primary",
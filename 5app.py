@@ -26,11 +26,8 @@ def process_excel_data(df):
         'Total Value': 'Amount'
     }
     
-    # Rename columns to match expected format
-    df_processed = df.copy()
-    for old_col, new_col in column_mapping.items():
-        if old_col in df.columns:
-            df_processed = df_processed.rename(columns={old_col: new_col})
+    # Rename columns to match expected format (rename returns a new frame)
+    df_processed = df.rename(columns={k: v for k, v in column_mapping.items() if k in df.columns})
     
     # Group by StyleID to aggregate data
     if 'StyleID' in df_processed.columns:
@@ -1,95 +1,52 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
-import base64
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
-def process_excel_data(df):
-    """Process Excel data to group by Style and sum quantities and values"""
-    # Filter out rows where Style is NaN or empty
-    df_clean = df.dropna(subset=['Style'])
-    
-    # Group by Style and sum the required columns
-    grouped = df_clean.groupby('Style').agg({
-        'Description': 'first',  # Take first description for each style
-        'Composition': 'first',  # Take first composition for each style
-        'USD Fob$': 'first',    # Take first unit price for each style
-        'Total Qty': 'sum',     # Sum all quantities for same style
-        'Total Value': 'sum'    # Sum all values for same style
-    }).reset_index()
-    
-    return grouped
-
-def generate_html_invoice(df, pi_number="SAR/LG/0148", date_str="14-10-2024", cpo_number="CPO/47062/25"):
-    """Generate HTML invoice matching the exact reference format"""
-    
-    # Process the data
-    processed_df = process_excel_data(df)
-    
-    total_qty = processed_df['Total Qty'].sum()
-    total_amount = processed_df['Total Value'].sum()
-    
-    # Generate table rows
-    table_rows = ""
-    for _, row in processed_df.iterrows():
-        qty = int(row['Total Qty'])
-        unit_price = float(row['USD Fob$'])
-        amount = float(row['Total Value'])
-        
-        table_rows += f"""
-        <tr>
-            <td>{row['Style']}</td>
-            <td>{row['Description']}</td>
-            <td>KNITTED</td>
-            <td>61112000</td>
-            <td>{row['Composition']}</td>
-            <td>India</td>
-            <td>{qty:,}</td>
-            <td>{unit_price:.2f}</td>
-            <td>{amount:.2f}</td>
-        </tr>
-        """
-    
-    html_content = f"""
+# Static parts of the HTML invoice, built once; only the header and footer
+# templates are formatted per invoice, with the table rows placed between them
+INVOICE_STYLE_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="UTF-8">
         <title>Proforma Invoice</title>
         <style>
-            @page {{
+            @page {
                 size: A4;
                 margin: 0.5in;
-            }}
-            body {{
+            }
+            body {
                 font-family: Arial, sans-serif;
                 font-size: 10px;
                 margin: 0;
                 padding: 20px;
                 line-height: 1.2;
-            }}
-            .header-table {{
+            }
+            .header-table {
                 width: 100%;
                 border-collapse: collapse;
                 margin-bottom: 15px;
-            }}
-            .header-table td {{
+            }
+            .header-table td {
                 padding: 2px 5px;
                 vertical-align: top;
                 font-size: 9px;
-            }}
-            .title {{
+            }
+            .title {
                 text-align: center;
                 font-size: 14px;
                 font-weight: bold;
                 margin: 10px 0;
-            }}
-            .main-table {{
+            }
+            .main-table {
                 width: 100%;
                 border-collapse: collapse;
                 border: 2px solid black;
                 margin: 10px 0;
-            }}
-            .main-table th {{
+            }
+            .main-table th {
                 background-color: #d3d3d3;
                 border: 1px solid black;
                 padding: 8px 4px;
@@ -97,43 +54,45 @@ def generate_html_invoice(df, pi_number="SAR/LG/0148", date_str="14-10-2024", cp
                 font-weight: bold;
                 font-size: 8px;
                 vertical-align: middle;
-            }}
-            .main-table td {{
+            }
+            .main-table td {
                 border: 1px solid black;
                 padding: 6px 4px;
                 text-align: center;
                 font-size: 9px;
                 vertical-align: middle;
-            }}
-            .total-row {{
+            }
+            .total-row {
                 font-weight: bold;
                 font-size: 10px;
-            }}
-            .total-words {{
+            }
+            .total-words {
                 font-weight: bold;
                 margin: 10px 0;
                 font-size: 10px;
-            }}
-            .signature-section {{
+            }
+            .signature-section {
                 margin-top: 30px;
                 font-size: 10px;
-            }}
-            .signature-table {{
+            }
+            .signature-table {
                 width: 100%;
                 border-collapse: collapse;
-            }}
-            .signature-table td {{
+            }
+            .signature-table td {
                 padding: 5px;
                 vertical-align: top;
-            }}
-            @media print {{
-                body {{ margin: 0; }}
-                .no-print {{ display: none; }}
-            }}
+            }
+            @media print {
+                body { margin: 0; }
+                .no-print { display: none; }
+            }
         </style>
     </head>
     <body>
-        <!-- Header Section -->
+"""
+
+INVOICE_HEADER_HTML = """        <!-- Header Section -->
         <table class="header-table">
             <tr>
                 <td style="width: 50%;"><strong>Supplier Name No. & date of PI</strong></td>
@@ -244,7 +203,9 @@ def generate_html_invoice(df, pi_number="SAR/LG/0148", date_str="14-10-2024", cp
                 </tr>
             </thead>
             <tbody>
-                {table_rows}
+                """
+
+INVOICE_FOOTER_HTML = """
                 <tr class="total-row">
                     <td colspan="6" style="text-align: right; font-weight: bold;">Total</td>
                     <td><strong>{total_qty:,}</strong></td>
@@ -277,8 +238,184 @@ def generate_html_invoice(df, pi_number="SAR/LG/0148", date_str="14-10-2024", cp
     </body>
     </html>
     """
+
+# The static head is encoded once for the download bytes
+INVOICE_STYLE_BYTES = INVOICE_STYLE_HTML.encode('utf-8')
+
+# Columns the invoice needs, and their types so read_excel can skip type inference
+REQUIRED_COLUMNS = ['Style', 'Description', 'Composition', 'USD Fob$', 'Total Qty', 'Total Value']
+# Total Qty is read as float so a fractional quantity doesn't fail the whole file;
+# quantities are truncated to whole numbers when the invoice is formatted
+EXCEL_DTYPES = {'Total Qty': 'float64', 'USD Fob$': 'float64', 'Total Value': 'float64'}
+
+# pandas is imported lazily so the UI renders before it loads; hash_funcs are keyed
+# by DataFrame's qualified name instead (it differs between pandas 2 and 3)
+DATAFRAME_TYPE_NAMES = ('pandas.core.frame.DataFrame', 'pandas.DataFrame')
+
+def read_excel_columns(file_bytes):
+    """Read only the header row of the uploaded Excel file"""
+    import pandas as pd
+    return pd.read_excel(io.BytesIO(file_bytes), engine='calamine', nrows=0).columns.tolist()
+
+def load_excel(file_bytes):
+    """Read the required columns of the uploaded Excel file"""
+    import pandas as pd
+    return pd.read_excel(io.BytesIO(file_bytes), engine='calamine', usecols=REQUIRED_COLUMNS, dtype=EXCEL_DTYPES)
+
+def hash_dataframe(df):
+    """
+    Cache key for the raw and grouped invoice frames
+    The index is hashed too: the grouped frame is keyed by Style, so two frames with
+    the same figures under different styles must not share a cached invoice
+    """
+    import pandas as pd
+    return tuple(df.columns), pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()
+
+def process_excel_data(df):
+    """
+    Process Excel data to group by Style and sum quantities and values
+    Returns: grouped DataFrame indexed by Style, total quantity, total value
+    """
+    # Filter out rows where Style is NaN or empty
+    style = df['Style']
+    mask = style.notna().to_numpy() & (style.to_numpy().astype(str) != '')
+    df_clean = df.iloc[mask]
+    
+    # Categorical styles let the groupby work on integer codes
+    df_clean = df_clean.assign(Style=df_clean['Style'].astype('category'))
+    by_style = df_clean.groupby('Style', sort=False, observed=True)
+    
+    # First non-blank description, composition and unit price of each style
+    firsts = by_style[['Description', 'Composition', 'USD Fob$']].first()
+    
+    # Sum quantities and values per style
+    sums = by_style[['Total Qty', 'Total Value']].sum()
+    
+    # Sorting the grouped result (one row per style) keeps styles in the same order as before;
+    # Style stays as the index rather than being copied back into a column
+    grouped = firsts.join(sums).sort_index()
+    
+    # Quantities are read as float; show whole-number quantities as integers again
+    if (grouped['Total Qty'] % 1 == 0).all():
+        grouped['Total Qty'] = grouped['Total Qty'].astype('int64')
+    
+    # Grand totals straight from the ungrouped arrays; they equal the sum of the group sums
+    total_qty = int(df_clean['Total Qty'].to_numpy(dtype='float64', na_value=0).sum())
+    total_amount = df_clean['Total Value'].to_numpy(dtype='float64', na_value=0).sum()
+    
+    return grouped, total_qty, total_amount
+
+def generate_html_invoice(processed_df, total_qty, total_amount, pi_number="SAR/LG/0148", date_str="14-10-2024", cpo_number="CPO/47062/25"):
+    """
+    Generate HTML invoice matching the exact reference format from the output of process_excel_data
+    Returns: the invoice as a string for the inline preview and as UTF-8 bytes for the download
+    """
+    import numpy as np
+    
+    # Format the numeric cells straight from NumPy arrays, one pass per column
+    qty_arr = processed_df['Total Qty'].to_numpy(dtype='int64')
+    qty_str = np.array([f'{qty:,}' for qty in qty_arr.tolist()], dtype=str)
+    price_str = np.char.mod('%.2f', processed_df['USD Fob$'].to_numpy(dtype='float64'))
+    amount_str = np.char.mod('%.2f', processed_df['Total Value'].to_numpy(dtype='float64'))
+    
+    # Build every row's HTML with vectorized string concatenation, then join once
+    td = '</td>\n            <td>'
+    rows = (
+        '\n        <tr>\n            <td>' + processed_df.index.to_series().astype(str)
+        + td + processed_df['Description'].astype(str)
+        + (td + 'KNITTED' + td + '61112000' + td) + processed_df['Composition'].astype(str)
+        + (td + 'India' + td) + qty_str
+        + td + price_str
+        + td + amount_str
+        + '</td>\n        </tr>\n        '
+    )
+    table_rows = "".join(rows.tolist())
+    
+    body = (
+        INVOICE_HEADER_HTML.format(pi_number=pi_number, date_str=date_str, cpo_number=cpo_number)
+        + table_rows
+        + INVOICE_FOOTER_HTML.format(total_qty=total_qty, total_amount=total_amount)
+    )
+    
+    # Only the per-invoice part needs encoding; the static head is already bytes
+    return INVOICE_STYLE_HTML + body, INVOICE_STYLE_BYTES + body.encode('utf-8')
+
+# Cached versions for the interactive app, keyed on the raw bytes and frames so reruns
+# skip the work; batch workers call the plain functions, as a worker process has no
+# Streamlit runtime to hold the cache
+cached_read_excel_columns = st.cache_data(show_spinner=False)(read_excel_columns)
+cached_load_excel = st.cache_data(show_spinner=False)(load_excel)
+cached_process_excel_data = st.cache_data(
+    show_spinner=False, hash_funcs=dict.fromkeys(DATAFRAME_TYPE_NAMES, hash_dataframe)
+)(process_excel_data)
+cached_generate_html_invoice = st.cache_data(
+    show_spinner=False, hash_funcs=dict.fromkeys(DATAFRAME_TYPE_NAMES, hash_dataframe)
+)(generate_html_invoice)
+
+def build_invoice(file_name, file_bytes, pi_number, date_str, cpo_number):
+    """
+    Build one invoice from the raw bytes of an uploaded Excel file
+    Self-contained so batch mode can run it in a worker process
+    Returns: file name for the invoice, invoice HTML as UTF-8 bytes
+    """
+    available_set = set(read_excel_columns(file_bytes))
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in available_set]
+    if missing_columns:
+        raise ValueError(f"{file_name}: missing required columns: {', '.join(missing_columns)}")
     
-    return html_content
+    processed_df, total_qty, total_amount = process_excel_data(load_excel(file_bytes))
+    _, html_bytes = generate_html_invoice(processed_df, total_qty, total_amount, pi_number, date_str, cpo_number)
+    
+    stem = os.path.splitext(file_name)[0]
+    return f"PI_{pi_number.replace('/', '_')}_{date_str}_{stem}.html", html_bytes
+
+def batch_mode(pi_number, date_str, cpo_number):
+    """Generate one invoice per uploaded file in parallel and offer them as a single zip"""
+    st.header("Upload Excel Files")
+    uploaded_files = st.file_uploader(
+        "Choose Excel files",
+        type=['xlsx', 'xls'],
+        accept_multiple_files=True,
+        help="Each file is turned into its own invoice using the details from the sidebar"
+    )
+    
+    if not uploaded_files:
+        st.info("📤 Upload one or more Excel files to generate invoices")
+        return
+    
+    st.success(f"✅ {len(uploaded_files)} files uploaded successfully!")
+    
+    if st.button("🚀 Generate Invoices", type="primary", use_container_width=True):
+        try:
+            with st.spinner("Generating Invoices..."):
+                # Each file is independent and CPU-bound, so spread them over processes
+                n = len(uploaded_files)
+                with ProcessPoolExecutor(max_workers=min(n, os.cpu_count() or 1)) as executor:
+                    results = list(executor.map(
+                        build_invoice,
+                        [f.name for f in uploaded_files],
+                        [f.getvalue() for f in uploaded_files],
+                        [pi_number] * n, [date_str] * n, [cpo_number] * n,
+                    ))
+                
+                zip_buffer = io.BytesIO()
+                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                    # Prefix the upload position so files sharing a name stay separate
+                    for i, (filename, html_bytes) in enumerate(results, start=1):
+                        zf.writestr(f"{i:02d}_{filename}", html_bytes)
+                
+                st.success(f"✅ {len(results)} Invoices Generated Successfully!")
+                
+                st.download_button(
+                    label="📥 Download Invoices (ZIP)",
+                    data=zip_buffer.getvalue(),
+                    file_name=f"PI_{pi_number.replace('/', '_')}_{date_str}.zip",
+                    mime="application/zip",
+                    use_container_width=True
+                )
+        
+        except Exception as e:
+            st.error(f"❌ Error generating invoices: {str(e)}")
 
 # Streamlit App
 def main():
@@ -291,8 +428,13 @@ def main():
     with st.sidebar:
         st.header("Invoice Details")
         pi_number = st.text_input("PI Number", value="SAR/LG/0148")
-        invoice_date = st.date_input("Invoice Date", value=datetime.now())
+        invoice_date = st.date_input("Invoice Date")
         cpo_number = st.text_input("CPO Number", value="CPO/47062/25")
+        batch = st.checkbox("Batch mode", value=False, help="Generate invoices for several Excel files at once")
+    
+    if batch:
+        batch_mode(pi_number, invoice_date.strftime("%d-%m-%Y"), cpo_number)
+        return
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -305,29 +447,37 @@ def main():
             help="Upload your Excel file containing Style, Description, Composition, USD Fob$, Total Qty, and Total Value columns"
         )
         
+        # Stays None unless the file is read and grouped, which is what col2 checks
+        processed_df = None
+        
         if uploaded_file is not None:
             try:
-                # Read the Excel file
-                df = pd.read_excel(uploaded_file)
+                # Copy the upload out once per file and reuse those bytes on every rerun
+                if st.session_state.get('xlsx_file_id') != uploaded_file.file_id:
+                    st.session_state['xlsx_bytes'] = uploaded_file.getvalue()
+                    st.session_state['xlsx_file_id'] = uploaded_file.file_id
+                file_bytes = st.session_state['xlsx_bytes']
                 
                 # Display file info
                 st.success(f"✅ File uploaded successfully!")
-                st.info(f"📊 Found {len(df)} rows in the Excel file")
                 
-                # Show preview of data
-                st.subheader("📋 Data Preview")
-                
-                # Check required columns
-                required_columns = ['Style', 'Description', 'Composition', 'USD Fob$', 'Total Qty', 'Total Value']
-                missing_columns = [col for col in required_columns if col not in df.columns]
+                # Check required columns from the header row before parsing the data
+                available_columns = cached_read_excel_columns(file_bytes)
+                available_set = set(available_columns)
+                missing_columns = [col for col in REQUIRED_COLUMNS if col not in available_set]
                 
                 if missing_columns:
                     st.error(f"❌ Missing required columns: {', '.join(missing_columns)}")
                     st.info("📝 Required columns: Style, Description, Composition, USD Fob$, Total Qty, Total Value")
-                    st.write("Available columns:", df.columns.tolist())
+                    st.write("Available columns:", available_columns)
                 else:
+                    # Read the Excel file (required columns only)
+                    df = cached_load_excel(file_bytes)
+                    st.info(f"📊 Found {len(df)} rows in the Excel file")
+                    
                     # Show processed data preview
-                    processed_df = process_excel_data(df)
+                    st.subheader("📋 Data Preview")
+                    processed_df, total_qty, total_amount = cached_process_excel_data(df)
                     st.dataframe(processed_df, use_container_width=True)
                     
                     st.subheader("📈 Summary")
@@ -335,45 +485,60 @@ def main():
                     with col_a:
                         st.metric("Unique Styles", len(processed_df))
                     with col_b:
-                        st.metric("Total Quantity", f"{processed_df['Total Qty'].sum():,}")
+                        st.metric("Total Quantity", f"{total_qty:,}")
                     with col_c:
-                        st.metric("Total Value", f"${processed_df['Total Value'].sum():,.2f}")
+                        st.metric("Total Value", f"${total_amount:,.2f}")
             
             except Exception as e:
                 st.error(f"❌ Error reading Excel file: {str(e)}")
+        else:
+            # Don't hold on to the file (or its invoice) once it has been removed
+            for key in ('xlsx_bytes', 'xlsx_file_id', 'invoice'):
+                st.session_state.pop(key, None)
     
     with col2:
         st.header("Generate Invoice")
         
-        if uploaded_file is not None and 'missing_columns' in locals() and not missing_columns:
+        if processed_df is not None:
+            date_str = invoice_date.strftime("%d-%m-%Y")
+            
+            # The generated invoice is kept in session state so reruns (such as ticking the
+            # preview box) still show it; it only counts for the same file and details
+            invoice_key = (st.session_state['xlsx_file_id'], pi_number, date_str, cpo_number)
+            
             if st.button("🚀 Generate Invoice", type="primary", use_container_width=True):
                 try:
                     with st.spinner("Generating Invoice..."):
                         # Generate HTML invoice
-                        date_str = invoice_date.strftime("%d-%m-%Y")
-                        html_content = generate_html_invoice(df, pi_number, date_str, cpo_number)
-                        
-                        st.success("✅ Invoice Generated Successfully!")
-                        
-                        # Display the invoice
-                        st.subheader("📋 Proforma Invoice")
-                        st.components.v1.html(html_content, height=800, scrolling=True)
-                        
-                        # Download button
-                        filename = f"PI_{pi_number.replace('/', '_')}_{date_str}.html"
-                        st.download_button(
-                            label="📥 Download Invoice (HTML)",
-                            data=html_content,
-                            file_name=filename,
-                            mime="text/html",
-                            use_container_width=True,
-                            help="Download as HTML file. You can open it in any browser and print/save as PDF using Ctrl+P"
-                        )
-                        
-                        st.info("💡 **To save as PDF:** Download the HTML file, open it in any browser, then press Ctrl+P (Cmd+P on Mac) and select 'Save as PDF'")
+                        html_content, html_bytes = cached_generate_html_invoice(processed_df, total_qty, total_amount, pi_number, date_str, cpo_number)
+                        st.session_state['invoice'] = (invoice_key, html_content, html_bytes)
                         
                 except Exception as e:
                     st.error(f"❌ Error generating invoice: {str(e)}")
+            
+            invoice = st.session_state.get('invoice')
+            if invoice is not None and invoice[0] == invoice_key:
+                _, html_content, html_bytes = invoice
+                
+                st.success("✅ Invoice Generated Successfully!")
+                
+                # Off by default: the inline preview sends the whole invoice HTML to the browser
+                if st.checkbox("Preview invoice inline", value=False):
+                    st.subheader("📋 Proforma Invoice")
+                    st.components.v1.html(html_content, height=800, scrolling=True)
+                
+                # Download button
+                filename = f"PI_{pi_number.replace('/', '_')}_{date_str}.html"
+                st.download_button(
+                    label="📥 Download Invoice (HTML)",
+                    data=html_bytes,
+                    file_name=filename,
+                    mime="text/html",
+                    use_container_width=True,
+                    help="Download as HTML file. You can open it in any browser and print/save as PDF using Ctrl+P"
+                )
+                
+                st.info("💡 **To save as PDF:** Download the HTML file, open it in any browser, then press Ctrl+P (Cmd+P on Mac) and select 'Save as PDF'")
         else:
             st.info("📤 Upload a valid Excel file to generate invoice")
 
@@ -89,29 +89,41 @@ def generate_proforma_invoice(df, pi_number=None, po_reference=None, shipment_da
          "COMPOSITION OF\nMATERIAL", "COUNTRY OF\nORIGIN", "QTY", "UNIT PRICE\nFOB", "AMOUNT"]
     ]
     
+    # Handle missing columns and NaN values once per column, not per row
+    column_defaults = {
+        "StyleID": "",
+        "Item Description": "",
+        "Fabric Type": "KNITTED",
+        "HS Code": "",
+        "Composition": "",
+        "Country of Origin": "India",
+        "Qty": 0,
+        "Unit Price": 0,
+        "Amount": 0
+    }
+    df = df.assign(**{
+        col: df[col].fillna(default) if col in df.columns else default
+        for col, default in column_defaults.items()
+    })
+    
     total_qty = 0
     total_amount = 0
     
     for _, row in df.iterrows():
-        qty = row.get("Qty", 0) or 0
-        price = row.get("Unit Price", 0) or 0
-        amount = row.get("Amount", 0) or 0
-        
-        # Handle NaN values
-        if pd.isna(qty): qty = 0
-        if pd.isna(price): price = 0
-        if pd.isna(amount): amount = 0
+        qty = row["Qty"] or 0
+        price = row["Unit Price"] or 0
+        amount = row["Amount"] or 0
         
         total_qty += qty
         total_amount += amount
         
         table_data.append([
-            str(row.get("StyleID", "") or ""),
-            str(row.get("Item Description", "") or ""),
-            str(row.get("Fabric Type", "KNITTED") or "KNITTED"),
-            str(row.get("HS Code", "") or "").replace(".", ""),  # Remove dots from HS code
-            str(row.get("Composition", "") or ""),
-            str(row.get("Country of Origin", "India") or "India"),
+            str(row["StyleID"] or ""),
+            str(row["Item Description"] or ""),
+            str(row["Fabric Type"] or "KNITTED"),
+            str(row["HS Code"] or "").replace(".", ""),  # Remove dots from HS code
+            str(row["Composition"] or ""),
+            str(row["Country of Origin"] or "India"),
             f"{qty:,}" if qty > 0 else "",
             f"{price:.2f}" if price > 0 else "",
             f"{amount:.2f}" if amount > 0 else ""